@@ -8,17 +8,20 @@ Created: October 2025
 Description: Automated LaTeX question booklet generator
 """
 
-import glob
 import hashlib
+import json
 import os
 import re
 import shutil
 import subprocess
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from fractions import Fraction
+from functools import lru_cache
 
 import openpyxl
-from sympy import I, Rational, cos, latex, pi, simplify, sin
 
 # ============================================================
 # CONFIGURATION
@@ -36,75 +39,250 @@ SHEET_NAME = "Worksheet"
 LOGO_FILE = "Brac_University_Logo.png"
 
 START_ROW = 2  # Data starts here (1-indexed, header on row 1)
+MAX_WORKERS = os.cpu_count() or 1  # Parallel pdflatex jobs
+# Source hash of every generated PDF, kept in output_dir for incremental runs
+SIGNATURES_FILE = ".signatures.json"
+# pdflatex scratch space; RAM-backed tmpfs where available
+SCRATCH_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else None
 
 
 # ============================================================
 # GENERIC UTILITIES
 # ============================================================
-def generate_integers_range(ID, variation, n, a, b):
+# (variation, low, high) for every question parameter, in a fixed order:
+# byte k of a student's digest feeds entry k
+QUESTION_PARAMS = (
+    ("Q1_n", 5, 7), ("Q1_r", 2, 3), ("Q1_arg", 0, 15),
+    ("Q2_n", 1, 5), ("Q2_a", 4, 9), ("Q2_b", 1, 7),
+    ("Q3_n", 1, 20), ("Q3_a", 4, 9), ("Q3_b", 1, 7),
+    ("Q4_a", 2, 9), ("Q4_r", 2, 9), ("Q4_arg", 0, 15),
+    ("Q5_n", 1, 12),
+    ("Q6_n", 1, 24), ("Q6_a", 2, 9), ("Q6_b", 2, 9),
+    ("Q7_n", 1, 2),
+    ("Q8_n", 1, 4), ("Q8_a", 2, 9), ("Q8_b", 2, 9),
+    ("Q9_a", 2, 9), ("Q9_b", 2, 9),
+    ("Q10_n", 1, 3), ("Q10_a", 2, 9), ("Q10_b", 2, 9), ("Q10_c", 2, 9),
+    ("Q10_d", 2, 9),
+    ("Q11_n", 1, 2), ("Q11_a", 2, 9), ("Q11_b", 2, 9), ("Q11_c", 2, 9),
+    ("Q12_n", 1, 2), ("Q12_a", 2, 9), ("Q12_b", 2, 9), ("Q12_c", 2, 9),
+    ("Q12_d", 2, 9),
+    ("Q13_n", 1, 2), ("Q13_a", 2, 9), ("Q13_b", 2, 9), ("Q13_c", 2, 9),
+    ("Q14_n", 1, 4), ("Q14_a", 2, 9), ("Q14_b", 2, 9), ("Q14_c", 2, 9),
+    ("Q14_d", 2, 9), ("Q14_e", 2, 9), ("Q14_f", 2, 9),
+    ("Q15_n", 1, 2), ("Q15_a", 2, 9), ("Q15_b", 2, 9),
+)
+# Same table as (variation, low, span), so each draw is one mod and one add
+PARAM_SPANS = tuple(
+    (name, low, high - low + 1) for name, low, high in QUESTION_PARAMS
+)
+
+
+def draw_parameters(ID, specs=PARAM_SPANS):
     """
-    Deterministic pseudo-random integers based on (ID, variation).
-    Uses MD5 -> hex pairs -> base-32 -> mod range mapping.
+    Deterministic question parameters for one student, drawn in one batch.
+    A single 64-byte BLAKE2b digest of the ID; byte k is mapped into the
+    range of specs[k], a (variation, low, span) triple. Returns
+    {variation: value}.
     """
-    seed = f"{ID}{variation}"
-    h = hashlib.md5(seed.encode()).hexdigest()
-    return [
-        (int(h[i:i + 2], 32) % (b - a + 1)) + a
-        for i in range(0, n * 2, 2)
-    ]
+    if len(specs) > 64:
+        raise ValueError("At most 64 parameters fit in one BLAKE2b digest.")
+    digest = hashlib.blake2b(str(ID).encode(), digest_size=64).digest()
+    return {
+        name: byte % span + low
+        for byte, (name, low, span) in zip(digest, specs)
+    }
+
+
+PLACEHOLDER_RE = re.compile(r"@(\w+)@")
 
 
 def replace_placeholders(template_text, **kwargs):
-    """Replace @Key@ placeholders in a LaTeX template."""
-    for key, val in kwargs.items():
-        template_text = template_text.replace(f"@{key}@", str(val))
-    return template_text
+    """
+    Replace @Key@ placeholders in a LaTeX template in a single pass.
+    Unknown placeholders are left untouched.
+    """
+    return PLACEHOLDER_RE.sub(
+        lambda m: str(kwargs.get(m.group(1), m.group(0))), template_text
+    )
 
 
-def compile_latex_to_pdf(tex_path):
+class TemplateValues(dict):
+    """format_map mapping that leaves unknown placeholders as @key@."""
+
+    def __missing__(self, key):
+        return f"@{key}@"
+
+
+def to_format_template(text, aliases=()):
     """
-    Compile .tex -> .pdf using pdflatex twice.
-    Prints a short log tail if compilation fails.
+    Convert a LaTeX snippet into a str.format template (done once at import).
+    Literal braces are doubled, each (old, new) alias is rewritten first,
+    then every @key@ placeholder becomes a {key} field.
     """
-    tex_dir = os.path.dirname(tex_path) or "."
-    tex_file = os.path.basename(tex_path)
-    pdf_path = os.path.splitext(tex_path)[0] + ".pdf"
+    text = text.replace("{", "{{").replace("}", "}}")
+    for old, new in aliases:
+        text = text.replace(old, new)
+    return PLACEHOLDER_RE.sub(r"{\1}", text)
 
-    cmd = ["pdflatex", "-interaction=nonstopmode", tex_file]
 
-    build_ok = False
-    last_stdout = ""
-    for _ in range(2):
+# Commands whose output is only correct after a second pdflatex pass
+CROSSREF_MARKERS = (
+    r"\ref{", r"\eqref{", r"\pageref{", r"\cite{", r"\tableofcontents",
+)
+
+
+def latex_passes(template_text):
+    """Return 2 if the template uses cross-references, otherwise 1."""
+    return 2 if any(m in template_text for m in CROSSREF_MARKERS) else 1
+
+
+def build_preamble_format(template_text, work_dir, name="preamble"):
+    """
+    Dump the template preamble into a pdflatex format with mylatexformat,
+    so each compile loads the packages precompiled instead of re-reading
+    them. Returns the format path (without .fmt), or None if the dump
+    fails; callers then compile without it.
+    """
+    src_path = os.path.join(work_dir, f"{name}.tex")
+    with open(src_path, "w", encoding="utf-8") as f_src:
+        f_src.write(template_text)
+
+    cmd = [
+        "pdflatex", "-ini", f"-jobname={name}", "-interaction=nonstopmode",
+        "&pdflatex", "mylatexformat.ltx", f"{name}.tex",
+    ]
+    try:
         result = subprocess.run(
-            cmd, cwd=tex_dir, stdout=subprocess.PIPE,
+            cmd, cwd=work_dir, stdout=subprocess.PIPE,
             stderr=subprocess.PIPE, text=True
         )
-        last_stdout = result.stdout
-        if result.returncode == 0:
-            build_ok = True
-            break
+    except OSError:
+        return None
 
-    # Allow filesystem to flush the PDF if it exists
-    for _ in range(10):
-        if os.path.exists(pdf_path):
-            build_ok = True
-            break
-        time.sleep(0.05)
+    fmt_path = os.path.join(work_dir, name)
+    if result.returncode != 0 or not os.path.exists(fmt_path + ".fmt"):
+        return None
+    return os.path.abspath(fmt_path)
+
+
+def compile_latex_to_pdf(job_dir, job_name, dest_dir, passes=1, fmt=None):
+    """
+    Compile job_dir/<job_name>.tex -> .pdf using `passes` pdflatex runs,
+    then move the PDF into dest_dir. All but the last run use -draftmode
+    (references only, no PDF output); `fmt` selects a precompiled preamble
+    format. Prints a short log tail if compilation fails.
+    """
+    tex_file = job_name + ".tex"
+    pdf_file = job_name + ".pdf"
+    pdf_path = os.path.join(job_dir, pdf_file)
+
+    cmd = ["pdflatex", "-interaction=nonstopmode", tex_file]
+    if fmt:
+        cmd.insert(1, f"-fmt={fmt}")
+    draft_cmd = cmd[:1] + ["-draftmode"] + cmd[1:]
+
+    for pass_cmd in [draft_cmd] * (passes - 1) + [cmd]:
+        result = subprocess.run(
+            pass_cmd, cwd=job_dir, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, text=True
+        )
+    last_stdout = result.stdout
+    # pdflatex has exited, so the PDF (if any) is already on disk; nonstop
+    # mode can emit a usable PDF despite a nonzero exit code, and a zero
+    # exit without a PDF leaves nothing to move.
+    build_ok = os.path.exists(pdf_path)
+
+    if not build_ok and fmt:
+        # The format dumped fine but something in it failed to load;
+        # give the student one more try with the full preamble
+        print(f"Retrying without the preamble format: {tex_file}")
+        return compile_latex_to_pdf(job_dir, job_name, dest_dir, passes)
 
     if not build_ok:
         print(f"Failed: {tex_file}")
         print("Log tail:\n" + "\n".join(last_stdout.splitlines()[-15:]))
         return False
 
-    print(f"Generated: {os.path.basename(pdf_path)}\n")
+    dest_path = os.path.join(dest_dir, pdf_file)
+    try:
+        os.replace(pdf_path, dest_path)  # one rename on the same filesystem
+    except OSError:
+        try:
+            shutil.move(pdf_path, dest_path)  # e.g. tmpfs scratch -> disk
+        except (OSError, shutil.Error) as e:
+            print(f"Failed to move {pdf_file}: {e}\n")
+            return False
+    print(f"Generated: {pdf_file}\n")
     return True
 
 
+def place_logo(dst_dir):
+    """
+    Make LOGO_FILE available in dst_dir without duplicating its bytes:
+    hard link, else symlink (e.g. across filesystems), else plain copy.
+    """
+    dst = os.path.join(dst_dir, os.path.basename(LOGO_FILE))
+    if os.path.lexists(dst):
+        return  # already placed (e.g. a repeated roster row)
+    try:
+        os.link(LOGO_FILE, dst)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.abspath(LOGO_FILE), dst)
+    except OSError:
+        shutil.copy(LOGO_FILE, dst_dir)
+
+
+def load_signatures(path):
+    """Return the {pdf name: source signature} manifest ({} if missing)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f_sig:
+            return json.load(f_sig)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_signatures(path, signatures):
+    """Write the {pdf name: source signature} manifest."""
+    with open(path, "w", encoding="utf-8") as f_sig:
+        json.dump(signatures, f_sig, indent=1, sort_keys=True)
+
+
+# ASCII characters safe_filename drops (everything but \w, \s and "-")
+SAFE_FILENAME_DELETE = str.maketrans("", "", "".join(
+    ch for ch in map(chr, range(128))
+    if not (ch.isalnum() or ch.isspace() or ch in "_-")
+))
+
+
 def safe_filename(name):
-    """Return a filesystem-safe basename for a given string."""
-    return re.sub(r"[^\w\s-]", "", str(name or "Unknown")).strip().replace(
-        " ", "_"
-    )
+    """
+    Return a filesystem-safe basename for a given string.
+    ASCII names go through one translate; others keep the Unicode-aware
+    regex so non-Latin letters survive.
+    """
+    name = str(name or "Unknown")
+    if name.isascii():
+        name = name.translate(SAFE_FILENAME_DELETE)
+    else:
+        name = re.sub(r"[^\w\s-]", "", name)
+    return name.strip().replace(" ", "_")
+
+
+LATEX_ESCAPES = str.maketrans({
+    "\\": r"\textbackslash{}",
+    "&": r"\&",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+})
 
 
 def latex_escape_text(s):
@@ -114,60 +292,92 @@ def latex_escape_text(s):
     """
     if s is None:
         return "Unknown"
-    repl = {
-        "\\": r"\textbackslash{}",
-        "&": r"\&",
-        "%": r"\%",
-        "$": r"\$",
-        "#": r"\#",
-        "_": r"\_",
-        "{": r"\{",
-        "}": r"\}",
-        "~": r"\textasciitilde{}",
-        "^": r"\textasciicircum{}",
-    }
-    return "".join(repl.get(ch, ch) for ch in str(s))
-
-
-def clean_directory(directory, extensions):
-    """Remove files by extension; prune empty subfolders."""
-    for ext in extensions:
-        for f in glob.glob(os.path.join(directory, f"**/*{ext}"),
-                           recursive=True):
-            try:
-                os.remove(f)
-            except Exception as e:
-                print(f"Skipped {f}: {e}")
-
-    for root, dirs, _ in os.walk(directory, topdown=False):
-        for d in dirs:
-            p = os.path.join(root, d)
-            try:
-                if not os.listdir(p):
-                    shutil.rmtree(p, ignore_errors=True)
-            except Exception:
-                pass
+    return str(s).translate(LATEX_ESCAPES)
 
 
 # ============================================================
 # MATH UTILITIES
 # ============================================================
+# Exact cos θ and sin θ at each standard angle, as (coefficient, surd)
+# pairs meaning coefficient·√surd.
+HALF = Fraction(1, 2)
+STANDARD_ANGLES = (
+    ((1, 1), (0, 1)),          # 0°
+    ((HALF, 3), (HALF, 1)),    # 30°
+    ((HALF, 2), (HALF, 2)),    # 45°
+    ((HALF, 1), (HALF, 3)),    # 60°
+    ((0, 1), (1, 1)),          # 90°
+    ((-HALF, 1), (HALF, 3)),   # 120°
+    ((-HALF, 2), (HALF, 2)),   # 135°
+    ((-HALF, 3), (HALF, 1)),   # 150°
+    ((-1, 1), (0, 1)),         # 180°
+    ((-HALF, 3), (-HALF, 1)),  # 210°
+    ((-HALF, 2), (-HALF, 2)),  # 225°
+    ((-HALF, 1), (-HALF, 3)),  # 240°
+    ((0, 1), (-1, 1)),         # 270°
+    ((HALF, 1), (-HALF, 3)),   # 300°
+    ((HALF, 2), (-HALF, 2)),   # 315°
+    ((HALF, 3), (-HALF, 1)),   # 330°
+)
+
+
+def latex_surd_term(coef, surd, imaginary=False):
+    """
+    LaTeX for coef·√surd, times i if `imaginary`.
+    Layout follows sympy's latex() so question text is unchanged.
+    """
+    coef = Fraction(coef)
+    num, den = abs(coef.numerator), coef.denominator
+    parts = []
+    if num != 1 or (surd == 1 and not imaginary):
+        parts.append(str(num))
+    if surd != 1:
+        parts.append(rf"\sqrt{{{surd}}}")
+    if imaginary:
+        parts.append("i")
+    body = " ".join(parts)
+    if den != 1:
+        body = rf"\frac{{{body}}}{{{den}}}"
+    if coef < 0:
+        return ("-" if body.isdigit() else "- ") + body
+    return body
+
+
+@lru_cache(maxsize=None)
 def complex_in_latex(r_val, theta_index):
     """
     Return LaTeX for r·(cosθ + i·sinθ) at standard angles.
-    θ index must be in [0, 15].
+    θ index must be in [0, 15]. Results are memoized: the (r, θ) domain
+    is small, so most students reuse an earlier result.
     """
-    angle_map = {
-        0: 0, 1: 30, 2: 45, 3: 60, 4: 90, 5: 120, 6: 135, 7: 150,
-        8: 180, 9: 210, 10: 225, 11: 240, 12: 270, 13: 300, 14: 315, 15: 330,
-    }
-    if theta_index not in angle_map:
+    if not 0 <= theta_index < len(STANDARD_ANGLES):
         raise ValueError("θ index must be between 0 and 15 (inclusive).")
 
-    r = Rational(r_val)
-    theta = Rational(angle_map[theta_index]) * pi / 180
-    z = simplify(r * (cos(theta) + I * sin(theta)))
-    return latex(z).replace(r"\operatorname{i}", "i").replace(r"\mathrm{i}", "i")
+    (c, c_surd), (s, s_surd) = STANDARD_ANGLES[theta_index]
+    r = Fraction(r_val)
+
+    # Odd multiples of 45°: √2 is factored out, e.g. \sqrt{2} \left(1 + i\right)
+    if c_surd == s_surd == 2:
+        k = r * HALF
+        sign_re = "-" if c < 0 else ""
+        sign_im = "-" if s < 0 else "+"
+        parts = [] if k.numerator == 1 else [str(k.numerator)]
+        parts += [r"\sqrt{2}", rf"\left({sign_re}1 {sign_im} i\right)"]
+        body = " ".join(parts)
+        if k.denominator != 1:
+            body = rf"\frac{{{body}}}{{{k.denominator}}}"
+        return body
+
+    re_part, im_part = r * c, r * s
+    if im_part == 0:
+        return latex_surd_term(re_part, c_surd)
+    if re_part == 0:
+        return latex_surd_term(im_part, s_surd, imaginary=True)
+    sign = "-" if im_part < 0 else "+"
+    return (
+        f"{latex_surd_term(re_part, c_surd)} {sign} "
+        f"{latex_surd_term(abs(im_part), s_surd, imaginary=True)}"
+    )
 
 
 # ============================================================
@@ -183,56 +393,51 @@ def Q1_get_nth_root(n: int, r_val: int, theta_index: int) -> str:
     )
 
 
+# Shorthand used by the graphing forms, rewritten to format fields at import
+GRAPHING_ALIASES = (
+    ("z+a", "z+@a@"), ("z-a", "z-@a@"), ("2a+b", "@apb@"), ("2a-b", "@amb@"),
+)
+
+Q2_FORMS = tuple(to_format_template(s, GRAPHING_ALIASES) for s in (
+    r"\left|\frac{z+ai}{z-ai}\right|=@b@",
+    r"|z+a|+|z-a|=2a+b",
+    r"|z+ai|+|z-ai|=2a+b",
+    r"|z-a|-|z+a|=2a-b",
+    r"|z-ai|-|z+ai|=2a-b",
+))
+
+
 def Q2_get_graphing_question_equality(n: int, a: int, b: int) -> str:
-    arr = [
-        r"\left|\frac{z+ai}{z-ai}\right|=@b@",
-        r"|z+a|+|z-a|=2a+b",
-        r"|z+ai|+|z-ai|=2a+b",
-        r"|z-a|-|z+a|=2a-b",
-        r"|z-ai|-|z+ai|=2a-b",
-    ]
-    s = arr[n - 1]
-    s = (
-        s.replace("@b@", str(b))
-        .replace("z+a", "z+" + str(a))
-        .replace("z-a", "z-" + str(a))
-        .replace("2a+b", str(2 * a + b))
-        .replace("2a-b", str(2 * a - b))
-    )
+    s = Q2_FORMS[n - 1].format(a=a, b=b, apb=2 * a + b, amb=2 * a - b)
     return rf"Describe the equation $\displaystyle {s}$ graphically on the complex plane."
 
 
+Q3_FORMS = tuple(to_format_template(s, GRAPHING_ALIASES) for s in (
+    r"\left|\frac{z+ai}{z-ai}\right| < @b@",
+    r"\left|\frac{z+ai}{z-ai}\right| > @b@",
+    r"\left|\frac{z+ai}{z-ai}\right| \le @b@",
+    r"\left|\frac{z+ai}{z-ai}\right| \ge @b@",
+    r"|z+a|+|z-a| < 2a+b",
+    r"|z+a|+|z-a| > 2a+b",
+    r"|z+a|+|z-a| \le 2a+b",
+    r"|z+a|+|z-a| \ge 2a+b",
+    r"|z+ai|+|z-ai| < 2a+b",
+    r"|z+ai|+|z-ai| > 2a+b",
+    r"|z+ai|+|z-ai| \le 2a+b",
+    r"|z+ai|+|z-ai| \ge 2a+b",
+    r"|z-a|-|z+a| < 2a-b",
+    r"|z-a|-|z+a| > 2a-b",
+    r"|z-a|-|z+a| \le 2a-b",
+    r"|z-a|-|z+a| \ge 2a-b",
+    r"|z-ai|-|z+ai| < 2a-b",
+    r"|z-ai|-|z+ai| > 2a-b",
+    r"|z-ai|-|z+ai| \le 2a-b",
+    r"|z-ai|-|z+ai| \ge 2a-b",
+))
+
+
 def Q3_get_graphing_question_inequality(n: int, a: int, b: int) -> str:
-    arr = [
-        r"\left|\frac{z+ai}{z-ai}\right| < @b@",
-        r"\left|\frac{z+ai}{z-ai}\right| > @b@",
-        r"\left|\frac{z+ai}{z-ai}\right| \le @b@",
-        r"\left|\frac{z+ai}{z-ai}\right| \ge @b@",
-        r"|z+a|+|z-a| < 2a+b",
-        r"|z+a|+|z-a| > 2a+b",
-        r"|z+a|+|z-a| \le 2a+b",
-        r"|z+a|+|z-a| \ge 2a+b",
-        r"|z+ai|+|z-ai| < 2a+b",
-        r"|z+ai|+|z-ai| > 2a+b",
-        r"|z+ai|+|z-ai| \le 2a+b",
-        r"|z+ai|+|z-ai| \ge 2a+b",
-        r"|z-a|-|z+a| < 2a-b",
-        r"|z-a|-|z+a| > 2a-b",
-        r"|z-a|-|z+a| \le 2a-b",
-        r"|z-a|-|z+a| \ge 2a-b",
-        r"|z-ai|-|z+ai| < 2a-b",
-        r"|z-ai|-|z+ai| > 2a-b",
-        r"|z-ai|-|z+ai| \le 2a-b",
-        r"|z-ai|-|z+ai| \ge 2a-b",
-    ]
-    s = arr[n - 1]
-    s = (
-        s.replace("@b@", str(b))
-        .replace("z+a", "z+" + str(a))
-        .replace("z-a", "z-" + str(a))
-        .replace("2a+b", str(2 * a + b))
-        .replace("2a-b", str(2 * a - b))
-    )
+    s = Q3_FORMS[n - 1].format(a=a, b=b, apb=2 * a + b, amb=2 * a - b)
     return rf"Describe the region $\displaystyle {s}$ graphically on the complex plane."
 
 
@@ -245,63 +450,73 @@ def Q4_get_solve_trig(a: int, r_val: int, theta_index: int) -> str:
     )
 
 
+Q5_FORMS = (
+    r"\sin^{-1} z = \frac{1}{i}\,\ln\!\big( iz + \sqrt{1 - z^2} \big)",
+    r"\cos^{-1} z = \frac{1}{i}\,\ln\!\big( z + \sqrt{z^2 - 1} \big)",
+    r"\tan^{-1} z = \frac{1}{2i}\,\ln\!\left( \frac{1 + iz}{1 - iz} \right)",
+    r"\cosec^{-1} z = \frac{1}{i}\,\ln\!\left( \frac{i + \sqrt{z^2 - 1}}{z} \right)",
+    r"\sec^{-1} z = \frac{1}{i}\,\ln\!\left( \frac{1 + \sqrt{1 - z^2}}{z} \right)",
+    r"\cot^{-1} z = \frac{1}{2i}\,\ln\!\left( \frac{z + i}{z - i} \right)",
+    r"\sinh^{-1} z = \ln\!\big( z + \sqrt{z^2 + 1} \big)",
+    r"\cosh^{-1} z = \ln\!\big( z + \sqrt{z^2 - 1} \big)",
+    r"\tanh^{-1} z = \frac{1}{2}\,\ln\!\left( \frac{1 + z}{1 - z} \right)",
+    r"\cosech^{-1} z = \ln\!\left( \frac{1 + \sqrt{z^2 + 1}}{z} \right)",
+    r"\sech^{-1} z = \ln\!\left( \frac{1 + \sqrt{1 - z^2}}{z} \right)",
+    r"\coth^{-1} z = \frac{1}{2}\,\ln\!\left( \frac{z + 1}{z - 1} \right)",
+)
+
+
+@lru_cache(maxsize=None)
 def Q5_get_prove_trig_hyp(n: int) -> str:
-    arr = [
-        r"\sin^{-1} z = \frac{1}{i}\,\ln\!\big( iz + \sqrt{1 - z^2} \big)",
-        r"\cos^{-1} z = \frac{1}{i}\,\ln\!\big( z + \sqrt{z^2 - 1} \big)",
-        r"\tan^{-1} z = \frac{1}{2i}\,\ln\!\left( \frac{1 + iz}{1 - iz} \right)",
-        r"\cosec^{-1} z = \frac{1}{i}\,\ln\!\left( \frac{i + \sqrt{z^2 - 1}}{z} \right)",
-        r"\sec^{-1} z = \frac{1}{i}\,\ln\!\left( \frac{1 + \sqrt{1 - z^2}}{z} \right)",
-        r"\cot^{-1} z = \frac{1}{2i}\,\ln\!\left( \frac{z + i}{z - i} \right)",
-        r"\sinh^{-1} z = \ln\!\big( z + \sqrt{z^2 + 1} \big)",
-        r"\cosh^{-1} z = \ln\!\big( z + \sqrt{z^2 - 1} \big)",
-        r"\tanh^{-1} z = \frac{1}{2}\,\ln\!\left( \frac{1 + z}{1 - z} \right)",
-        r"\cosech^{-1} z = \ln\!\left( \frac{1 + \sqrt{z^2 + 1}}{z} \right)",
-        r"\sech^{-1} z = \ln\!\left( \frac{1 + \sqrt{1 - z^2}}{z} \right)",
-        r"\coth^{-1} z = \frac{1}{2}\,\ln\!\left( \frac{z + 1}{z - 1} \right)",
-    ]
-    s = arr[n - 1]
+    s = Q5_FORMS[n - 1]
     return fr"Prove that $${s}.$$"
 
 
+# "a+bi" / "a-bi" in the Q6 forms stand for the drawn a and b
+SOLVE_ALIASES = (("a+b", "@a@+@b@"), ("a-b", "@a@-@b@"))
+
+Q6_FORMS = tuple(to_format_template(s, SOLVE_ALIASES) for s in (
+    r"\sin z = a+bi",  r"\sin z = a-bi",
+    r"\cos z = a+bi",  r"\cos z = a-bi",
+    r"\tan z = a+bi",  r"\tan z = a-bi",
+    r"\cosec z = a+bi",  r"\cosec z = a-bi",
+    r"\sec z = a+bi",  r"\sec z = a-bi",
+    r"\cot z = a+bi",  r"\cot z = a-bi",
+    r"\sinh z = a+bi", r"\sinh z = a-bi",
+    r"\cosh z = a+bi", r"\cosh z = a-bi",
+    r"\tanh z = a+bi", r"\tanh z = a-bi",
+    r"\cosech z = a+bi", r"\cosech z = a-bi",
+    r"\sech z = a+bi", r"\sech z = a-bi",
+    r"\coth z = a+bi", r"\coth z = a-bi",
+))
+
+
+@lru_cache(maxsize=None)
 def Q6_get_solve_trig_hyp(n: int, a: int, b: int) -> str:
-    arr = [
-        r"\sin z = a+bi",  r"\sin z = a-bi",
-        r"\cos z = a+bi",  r"\cos z = a-bi",
-        r"\tan z = a+bi",  r"\tan z = a-bi",
-        r"\cosec z = a+bi",  r"\cosec z = a-bi",
-        r"\sec z = a+bi",  r"\sec z = a-bi",
-        r"\cot z = a+bi",  r"\cot z = a-bi",
-        r"\sinh z = a+bi", r"\sinh z = a-bi",
-        r"\cosh z = a+bi", r"\cosh z = a-bi",
-        r"\tanh z = a+bi", r"\tanh z = a-bi",
-        r"\cosech z = a+bi", r"\cosech z = a-bi",
-        r"\sech z = a+bi", r"\sech z = a-bi",
-        r"\coth z = a+bi", r"\coth z = a-bi",
-    ]
-    s = arr[n - 1]
-    s = s.replace("a+b", f"{a}+{b}").replace("a-b", f"{a}-{b}")
+    s = Q6_FORMS[n - 1].format(a=a, b=b)
     return rf"Solve for $z$ where \[{s}.\]"
 
 
+Q7_FORMS = (
+    r"Using the definition of a limit, show that $\displaystyle \lim_{z \to 0} \frac{\operatorname{Re}(z^2)}{|z|^2}$ does not exist.",
+    r"Using the definition of a limit, show that $\displaystyle \lim_{z \to 0} \frac{\operatorname{Im}(z^2)}{|z|^2}$ does not exist.",
+)
+
+
 def Q7_get_limit_not_exists(n: int) -> str:
-    arr = [
-        r"Using the definition of a limit, show that $\displaystyle \lim_{z \to 0} \frac{\operatorname{Re}(z^2)}{|z|^2}$ does not exist.",
-        r"Using the definition of a limit, show that $\displaystyle \lim_{z \to 0} \frac{\operatorname{Im}(z^2)}{|z|^2}$ does not exist.",
-    ]
-    return arr[n - 1]
+    return Q7_FORMS[n - 1]
+
+
+Q8_FORMS = tuple(to_format_template(s) for s in (
+    r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \frac{\sin z}{z} \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
+    r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \frac{\tan z}{z} \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
+    r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \cos z \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
+    r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \sec z \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
+))
 
 
 def Q8_get_limit_LHopital(n: int, a: int, b: int) -> str:
-    arr = [
-        r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \frac{\sin z}{z} \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
-        r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \frac{\tan z}{z} \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
-        r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \cos z \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
-        r"Using L’Hôpital’s rule, evaluate $$ \lim_{z \to 0} \left( \sec z \right)^{\frac{@a@ \sin(z)}{z - \sin z}}.$$",
-    ]
-    s = arr[n - 1]
-    s = s.replace("@a@", str(a)).replace("@b@", str(b))
-    return s
+    return Q8_FORMS[n - 1].format(a=a, b=b)
 
 
 def Q9_get_Continuity(a: int, b: int) -> str:
@@ -312,92 +527,75 @@ def Q9_get_Continuity(a: int, b: int) -> str:
     )
 
 
+Q10_FORMS = tuple(to_format_template(s) for s in (
+    r"Using the definition, find the derivative of $ \displaystyle f(z) = \frac{@a@z-@b@}{@c@z+@d@i} \quad \text{at} \quad z = i$.",
+    r"Using the definition, find the derivative of $ \displaystyle f(z) = \frac{@a@}{@b@z + @c@} \quad \text{at} \quad z = z_0$.",
+    r"Using the definition, find the derivative of $ \displaystyle f(z) = \frac{@a@}{z^2} \quad \text{at} \quad z = @b@+@c@i$.",
+))
+
+
+@lru_cache(maxsize=None)
 def Q10_get_derivative(n: int, a: int, b: int, c: int, d: int) -> str:
-    arr = [
-        r"Using the definition, find the derivative of $ \displaystyle f(z) = \frac{@a@z-@b@}{@c@z+@d@i} \quad \text{at} \quad z = i$.",
-        r"Using the definition, find the derivative of $ \displaystyle f(z) = \frac{@a@}{@b@z + @c@} \quad \text{at} \quad z = z_0$.",
-        r"Using the definition, find the derivative of $ \displaystyle f(z) = \frac{@a@}{z^2} \quad \text{at} \quad z = @b@+@c@i$.",
-    ]
-    s = arr[n - 1]
-    s = (
-        s.replace("@a@", str(a))
-        .replace("@b@", str(b))
-        .replace("@c@", str(c))
-        .replace("@d@", str(d))
-    )
-    return s
+    return Q10_FORMS[n - 1].format(a=a, b=b, c=c, d=d)
 
 
+Q11_FORMS = tuple(to_format_template(s) for s in (
+    r"Using the definition, show that $$f(z)=@a@z^3 + @b@z - @c@$$ is differentiable at all points. Also find the derivative.",
+    r"Using the definition, show that $$f(z)=@a@z\bar{z} - @b@z + @c@\bar{z}$$ is not differentiable at any point.",
+))
+
+
+@lru_cache(maxsize=None)
 def Q11_get_derivative(n: int, a: int, b: int, c: int) -> str:
-    arr = [
-        r"Using the definition, show that $$f(z)=@a@z^3 + @b@z - @c@$$ is differentiable at all points. Also find the derivative.",
-        r"Using the definition, show that $$f(z)=@a@z\bar{z} - @b@z + @c@\bar{z}$$ is not differentiable at any point.",
-    ]
-    s = arr[n - 1]
-    s = s.replace("@a@", str(a)).replace("@b@", str(b)).replace("@c@", str(c))
-    return s
+    return Q11_FORMS[n - 1].format(a=a, b=b, c=c)
+
+
+Q12_FORMS = tuple(to_format_template(s) for s in (
+    r"Consider the function \[ f(z) = @a@ \sin(@b@z) - @c@ \cosh(@d@z).\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
+    r"Consider the function \[ f(z) = @a@ \sinh(@b@z) - @c@ \cos(@d@z).\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
+))
 
 
 def Q12_get_analytic(n: int, a: int, b: int, c: int, d: int) -> str:
-    arr = [
-        r"Consider the function \[ f(z) = @a@ \sin(@b@z) - @c@ \cosh(@d@z).\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
-        r"Consider the function \[ f(z) = @a@ \sinh(@b@z) - @c@ \cos(@d@z).\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
-    ]
-    s = arr[n - 1]
-    s = (
-        s.replace("@a@", str(a))
-        .replace("@b@", str(b))
-        .replace("@c@", str(c))
-        .replace("@d@", str(d))
-    )
-    return s
+    return Q12_FORMS[n - 1].format(a=a, b=b, c=c, d=d)
+
+
+Q13_FORMS = tuple(to_format_template(s) for s in (
+    r"Consider the function \[ f(z) = @a@|z|^2 + @b@z - @c@\bar{z}.\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
+    r"Consider the function \[ f(z) = @a@ze^{-@b@z}.\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
+))
 
 
 def Q13_get_analytic(n: int, a: int, b: int, c: int) -> str:
-    arr = [
-        r"Consider the function \[ f(z) = @a@|z|^2 + @b@z - @c@\bar{z}.\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
-        r"Consider the function \[ f(z) = @a@ze^{-@b@z}.\] Using the Cauchy–Riemann equations, determine whether the function is analytic.",
-    ]
-    s = arr[n - 1]
-    s = (
-        s.replace("@a@", str(a))
-        .replace("@b@", str(b))
-        .replace("@c@", str(c))
-    )
-    return s
+    return Q13_FORMS[n - 1].format(a=a, b=b, c=c)
 
 
-def Q14_get_harmonic(n: int, a: int, b: int, c: int, d: int, e: int, f: int) -> str:
-    arr = [
-        r"Show that the function \[ U(x,y) = @a@ e^{-@b@x}\cos(@b@y)\;-\; @c@ e^{@d@y}\sin(@d@x) \;+\; @3e@\,x^2y \;-\; @f@x^2 \;-\; @e@y^3 \;+\; @f@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$V$} of \textbf{$U$} such that \textbf{$U+Vi$} becomes analytic.",
+Q14_FORMS = tuple(to_format_template(s) for s in (
+    r"Show that the function \[ U(x,y) = @a@ e^{-@b@x}\cos(@b@y)\;-\; @c@ e^{@d@y}\sin(@d@x) \;+\; @e3@\,x^2y \;-\; @f@x^2 \;-\; @e@y^3 \;+\; @f@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$V$} of \textbf{$U$} such that \textbf{$U+Vi$} becomes analytic.",
 
-        r"Show that the function \[ V(x,y) = @a@ e^{-@b@x}\cos(@b@y)\;-\; @c@ e^{@d@y}\sin(@d@x) \;+\; @3e@\,x^2y \;-\; @f@x^2 \;-\; @e@y^3 \;+\; @f@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$U$} of \textbf{$V$} such that \textbf{$U+Vi$} becomes analytic.",
+    r"Show that the function \[ V(x,y) = @a@ e^{-@b@x}\cos(@b@y)\;-\; @c@ e^{@d@y}\sin(@d@x) \;+\; @e3@\,x^2y \;-\; @f@x^2 \;-\; @e@y^3 \;+\; @f@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$U$} of \textbf{$V$} such that \textbf{$U+Vi$} becomes analytic.",
 
-        r"Show that the function \[ U(x,y) = @a@ \sin(@b@x)\cosh(@b@y) \;+\; @3c@\,x^2y \;-\; @d@x^2 \;-\; @c@y^3 \;+\; @d@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$V$} of \textbf{$U$} such that \textbf{$U+Vi$} becomes analytic.",
+    r"Show that the function \[ U(x,y) = @a@ \sin(@b@x)\cosh(@b@y) \;+\; @c3@\,x^2y \;-\; @d@x^2 \;-\; @c@y^3 \;+\; @d@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$V$} of \textbf{$U$} such that \textbf{$U+Vi$} becomes analytic.",
 
-        r"Show that the function \[ V(x,y) = @a@ \sin(@b@x)\cosh(@b@y) \;+\; @3c@\,x^2y \;-\; @d@x^2 \;-\; @c@y^3 \;+\; @d@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$U$} of \textbf{$V$} such that \textbf{$U+Vi$} becomes analytic.",
-    ]
-    s = arr[n - 1]
-    s = (
-        s.replace("@a@", str(a))
-        .replace("@b@", str(b))
-        .replace("@c@", str(c))
-        .replace("@d@", str(d))
-        .replace("@e@", str(e))
-        .replace("@f@", str(f))
-        .replace("@3c@", str(3 * c))
-        .replace("@3e@", str(3 * e))
+    r"Show that the function \[ V(x,y) = @a@ \sin(@b@x)\cosh(@b@y) \;+\; @c3@\,x^2y \;-\; @d@x^2 \;-\; @c@y^3 \;+\; @d@y^2 \] is harmonic. Find the harmonic conjugate \textbf{$U$} of \textbf{$V$} such that \textbf{$U+Vi$} becomes analytic.",
+))
+
+
+def Q14_get_harmonic(n: int, a: int, b: int, c: int, d: int, e: int, f: int) -> str:
+    return Q14_FORMS[n - 1].format(
+        a=a, b=b, c=c, d=d, e=e, f=f, c3=3 * c, e3=3 * e
     )
-    return s
 
 
-def Q15_get_harmonic(n: int, a: int, b: int) -> str:
-    arr = [
-        r"Show that the function \[ U(x,y) = @a@\, x e^{-@b@x}\cos(@b@y) \;+\; @a@\, y e^{-@b@x}\sin(@b@y) \] is harmonic. Find the harmonic conjugate \textbf{$V$} of \textbf{$U$} such that \textbf{$U+Vi$} becomes analytic.",
+Q15_FORMS = tuple(to_format_template(s) for s in (
+    r"Show that the function \[ U(x,y) = @a@\, x e^{-@b@x}\cos(@b@y) \;+\; @a@\, y e^{-@b@x}\sin(@b@y) \] is harmonic. Find the harmonic conjugate \textbf{$V$} of \textbf{$U$} such that \textbf{$U+Vi$} becomes analytic.",
 
-        r"Show that the function \[ V(x,y) = @a@\, x e^{-@b@x}\cos(@b@y) \;+\; @a@\, y e^{-@b@x}\sin(@b@y) \] is harmonic. Find the harmonic conjugate \textbf{$U$} of \textbf{$V$} such that \textbf{$U+Vi$} becomes analytic."
-    ]
-    return arr[n - 1].replace("@a@", str(a)).replace("@b@", str(b))
+    r"Show that the function \[ V(x,y) = @a@\, x e^{-@b@x}\cos(@b@y) \;+\; @a@\, y e^{-@b@x}\sin(@b@y) \] is harmonic. Find the harmonic conjugate \textbf{$U$} of \textbf{$V$} such that \textbf{$U+Vi$} becomes analytic."
+))
+
+
+def Q15_get_harmonic(n: int, a: int, b: int) -> str:
+    return Q15_FORMS[n - 1].format(a=a, b=b)
 
 
 # ============================================================
@@ -413,16 +611,22 @@ output_dir = ASSESSMENT_TYPE
 os.makedirs(output_dir, exist_ok=True)
 print(f"Output directory: {output_dir}")
 
-# Copy logo (some templates include it from working dir)
+# PDFs whose rendered source is unchanged since the last run are skipped
+signatures_path = os.path.join(output_dir, SIGNATURES_FILE)
+signatures = load_signatures(signatures_path)
+
+# Logo is linked into each job folder (templates include it from cwd)
 if os.path.exists(LOGO_FILE):
-    shutil.copy(LOGO_FILE, output_dir)
-    print(f"Copied logo → {output_dir}/")
+    print(f"Using logo: {LOGO_FILE}")
 else:
     print(f"Logo not found: '{LOGO_FILE}' (skipped)")
 
 # Load workbook/template
 try:
-    workbook = openpyxl.load_workbook(WORKBOOK_PATH)
+    # Read-only mode streams rows instead of building the full cell graph
+    workbook = openpyxl.load_workbook(
+        WORKBOOK_PATH, read_only=True, data_only=True
+    )
     sheet = workbook[SHEET_NAME]
 except Exception as e:
     raise SystemExit(f"Error loading workbook/sheet: {e}")
@@ -433,189 +637,239 @@ try:
 except FileNotFoundError:
     raise SystemExit(f"Template not found: {TEMPLATE_PATH}")
 
+# A second pdflatex pass only pays off when there are references to resolve
+pdflatex_passes = latex_passes(template)
+print(f"pdflatex passes per document: {pdflatex_passes}")
+
+# Fill run-wide constants once; only per-student fields are left in the loop
+template = replace_placeholders(
+    template,
+    Section=SECTION,
+    CourseName=COURSE_NAME,
+    CourseCode=COURSE_CODE,
+    SemesterName=SEMESTER_NAME,
+    AssessmentType=ASSESSMENT_TYPE,
+    TotalPoints=TOTAL_POINTS,
+)
+# Remaining per-student fields are filled by a single format_map call
+template_fmt = to_format_template(template)
+
 print("\nStarting PDF generation...\n")
 
 
 # ============================================================
 # MAIN LOOP
 # ============================================================
-count_success, count_fail = 0, 0
-row = START_ROW
+count_success, count_fail, count_skipped = 0, 0, 0
+rows = sheet.iter_rows(min_row=START_ROW, max_col=2, values_only=True)
+
+# Each student compiles in its own folder under a scratch dir; only the
+# finished PDF is moved to output_dir, so aux files never touch it.
+scratch_dir = tempfile.mkdtemp(prefix="latex-jobs-", dir=SCRATCH_ROOT)
+print(f"Scratch directory: {scratch_dir}")
+
+# pdflatex runs as a child process, so threads are enough to keep every
+# core busy without pickling the module-level script state. Each job is
+# submitted as soon as its .tex is written, so compiling overlaps with
+# generating the remaining students.
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+futures = {}
+
+# The scratch dir lives in RAM, so it must go however the run ends
+try:
+    # The shared preamble is precompiled just before the first compile, so
+    # a run where every PDF is up to date skips the format dump entirely
+    preamble_fmt, preamble_built = None, False
 
-while True:
-    ID = sheet.cell(row=row, column=1).value
-    Name = sheet.cell(row=row, column=2).value
+    for index, (ID, Name) in enumerate(rows, start=1):
+        if not ID:
+            break
 
-    if not ID:
-        print(
-            f"\nCompleted processing. {count_success} succeeded, "
-            f"{count_fail} failed."
-        )
-        break
+        safe_name = safe_filename(Name)
+        latex_name = latex_escape_text(Name)
 
-    safe_name = safe_filename(Name)
-    latex_name = latex_escape_text(Name)
+        print(f"[{index}] Processing: {Name}")
+        job_name = f"{ID}_{safe_name}"  # shared stem of the .tex and .pdf
 
-    print(f"[{row - START_ROW + 1}] Processing: {Name}")
+        params = draw_parameters(ID)
 
-    Q1 = Q1_get_nth_root(
-        generate_integers_range(ID, "Q1_n", 1, 5, 7)[0],
-        generate_integers_range(ID, "Q1_r", 1, 2, 3)[0],
-        generate_integers_range(ID, "Q1_arg", 1, 0, 15)[0],
-    )
+        Q1 = Q1_get_nth_root(
+            params["Q1_n"],
+            params["Q1_r"],
+            params["Q1_arg"],
+        )
 
-    Q2 = Q2_get_graphing_question_equality(
-        generate_integers_range(ID, "Q2_n", 1, 1, 5)[0],
-        generate_integers_range(ID, "Q2_a", 1, 4, 9)[0],
-        generate_integers_range(ID, "Q2_b", 1, 1, 7)[0],
-    )
+        Q2 = Q2_get_graphing_question_equality(
+            params["Q2_n"],
+            params["Q2_a"],
+            params["Q2_b"],
+        )
 
-    Q3 = Q3_get_graphing_question_inequality(
-        generate_integers_range(ID, "Q3_n", 1, 1, 20)[0],
-        generate_integers_range(ID, "Q3_a", 1, 4, 9)[0],
-        generate_integers_range(ID, "Q3_b", 1, 1, 7)[0],
-    )
+        Q3 = Q3_get_graphing_question_inequality(
+            params["Q3_n"],
+            params["Q3_a"],
+            params["Q3_b"],
+        )
 
-    Q4 = Q4_get_solve_trig(
-        generate_integers_range(ID, "Q4_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q4_r", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q4_arg", 1, 0, 15)[0],
-    )
+        Q4 = Q4_get_solve_trig(
+            params["Q4_a"],
+            params["Q4_r"],
+            params["Q4_arg"],
+        )
 
-    Q5 = Q5_get_prove_trig_hyp(
-        generate_integers_range(ID, "Q5_n", 1, 1, 12)[0]
-    )
+        Q5 = Q5_get_prove_trig_hyp(
+            params["Q5_n"]
+        )
 
-    Q6 = Q6_get_solve_trig_hyp(
-        generate_integers_range(ID, "Q6_n", 1, 1, 24)[0],
-        generate_integers_range(ID, "Q6_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q6_b", 1, 2, 9)[0],
-    )
+        Q6 = Q6_get_solve_trig_hyp(
+            params["Q6_n"],
+            params["Q6_a"],
+            params["Q6_b"],
+        )
 
-    Q7 = Q7_get_limit_not_exists(
-        generate_integers_range(ID, "Q7_n", 1, 1, 2)[0]
-    )
+        Q7 = Q7_get_limit_not_exists(
+            params["Q7_n"]
+        )
 
-    Q8 = Q8_get_limit_LHopital(
-        generate_integers_range(ID, "Q8_n", 1, 1, 4)[0],
-        generate_integers_range(ID, "Q8_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q8_b", 1, 2, 9)[0],
-    )
+        Q8 = Q8_get_limit_LHopital(
+            params["Q8_n"],
+            params["Q8_a"],
+            params["Q8_b"],
+        )
 
-    Q9 = Q9_get_Continuity(
-        generate_integers_range(ID, "Q9_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q9_b", 1, 2, 9)[0],
-    )
+        Q9 = Q9_get_Continuity(
+            params["Q9_a"],
+            params["Q9_b"],
+        )
 
-    Q10 = Q10_get_derivative(
-        generate_integers_range(ID, "Q10_n", 1, 1, 3)[0],
-        generate_integers_range(ID, "Q10_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q10_b", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q10_c", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q10_d", 1, 2, 9)[0],
-    )
+        Q10 = Q10_get_derivative(
+            params["Q10_n"],
+            params["Q10_a"],
+            params["Q10_b"],
+            params["Q10_c"],
+            params["Q10_d"],
+        )
 
-    Q11 = Q11_get_derivative(
-        generate_integers_range(ID, "Q11_n", 1, 1, 2)[0],
-        generate_integers_range(ID, "Q11_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q11_b", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q11_c", 1, 2, 9)[0],
-    )
+        Q11 = Q11_get_derivative(
+            params["Q11_n"],
+            params["Q11_a"],
+            params["Q11_b"],
+            params["Q11_c"],
+        )
 
-    Q12 = Q12_get_analytic(
-        generate_integers_range(ID, "Q12_n", 1, 1, 2)[0],
-        generate_integers_range(ID, "Q12_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q12_b", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q12_c", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q12_d", 1, 2, 9)[0],
-    )
+        Q12 = Q12_get_analytic(
+            params["Q12_n"],
+            params["Q12_a"],
+            params["Q12_b"],
+            params["Q12_c"],
+            params["Q12_d"],
+        )
 
-    Q13 = Q13_get_analytic(
-        generate_integers_range(ID, "Q13_n", 1, 1, 2)[0],
-        generate_integers_range(ID, "Q13_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q13_b", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q13_c", 1, 2, 9)[0],
-    )
+        Q13 = Q13_get_analytic(
+            params["Q13_n"],
+            params["Q13_a"],
+            params["Q13_b"],
+            params["Q13_c"],
+        )
 
-    Q14 = Q14_get_harmonic(
-        generate_integers_range(ID, "Q14_n", 1, 1, 4)[0],
-        generate_integers_range(ID, "Q14_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q14_b", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q14_c", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q14_d", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q14_e", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q14_f", 1, 2, 9)[0],
-    )
+        Q14 = Q14_get_harmonic(
+            params["Q14_n"],
+            params["Q14_a"],
+            params["Q14_b"],
+            params["Q14_c"],
+            params["Q14_d"],
+            params["Q14_e"],
+            params["Q14_f"],
+        )
 
-    Q15 = Q15_get_harmonic(
-        generate_integers_range(ID, "Q15_n", 1, 1, 2)[0],
-        generate_integers_range(ID, "Q15_a", 1, 2, 9)[0],
-        generate_integers_range(ID, "Q15_b", 1, 2, 9)[0],
-    )
+        Q15 = Q15_get_harmonic(
+            params["Q15_n"],
+            params["Q15_a"],
+            params["Q15_b"],
+        )
 
-    tex_content = replace_placeholders(
-        template,
-        Name=latex_name,
-        ID=ID,
-        Section=SECTION,
-        CourseName=COURSE_NAME,
-        CourseCode=COURSE_CODE,
-        SemesterName=SEMESTER_NAME,
-        AssessmentType=ASSESSMENT_TYPE,
-        TotalPoints=TOTAL_POINTS,
-
-        Q1=Q1, Q2=Q2, Q3=Q3, Q4=Q4, Q5=Q5,
-        Q6=Q6, Q7=Q7, Q8=Q8, Q9=Q9, Q10=Q10,
-        Q11=Q11, Q12=Q12, Q13=Q13, Q14=Q14, Q15=Q15,
+        tex_content = template_fmt.format_map(TemplateValues(
+            Name=latex_name,
+            ID=ID,
+
+            Q1=Q1, Q2=Q2, Q3=Q3, Q4=Q4, Q5=Q5,
+            Q6=Q6, Q7=Q7, Q8=Q8, Q9=Q9, Q10=Q10,
+            Q11=Q11, Q12=Q12, Q13=Q13, Q14=Q14, Q15=Q15,
+        )).encode("utf-8")
+
+        # The rendered source covers the row, config, template and question bank
+        signature = hashlib.blake2b(tex_content, digest_size=16).hexdigest()
+        pdf_filename = job_name + ".pdf"
+        if (signatures.get(pdf_filename) == signature
+                and os.path.exists(os.path.join(output_dir, pdf_filename))):
+            print(f"Up to date: {pdf_filename}")
+            count_skipped += 1
+            continue
+
+        # Each student gets its own scratch folder so parallel pdflatex runs
+        # never share .aux/.log files
+        job_dir = tempfile.mkdtemp(prefix=job_name + "-", dir=scratch_dir)
+        if os.path.exists(LOGO_FILE):
+            place_logo(job_dir)
+
+        tex_path = os.path.join(job_dir, job_name + ".tex")
+
+        with open(tex_path, "wb") as f_out:
+            f_out.writelines((tex_content, b"\n"))
+
+        if not preamble_built:
+            preamble_fmt = build_preamble_format(template, scratch_dir)
+            preamble_built = True
+            if preamble_fmt:
+                print(f"Preamble format: {preamble_fmt}.fmt")
+            else:
+                print("Preamble format unavailable (mylatexformat?); "
+                      "compiling in full")
+
+        future = executor.submit(
+            compile_latex_to_pdf, job_dir, job_name, output_dir,
+            pdflatex_passes, preamble_fmt,
+        )
+        futures[future] = (job_name, signature)
+
+    workbook.close()
+
+    # ============================================================
+    # COMPILE (parallel pdflatex)
+    # ============================================================
+    print(f"\nWaiting for {len(futures)} documents ({MAX_WORKERS} workers)...\n")
+
+    for future in as_completed(futures):
+        job_name, signature = futures[future]
+        pdf_filename = job_name + ".pdf"
+        if future.result():
+            count_success += 1
+            signatures[pdf_filename] = signature
+        else:
+            count_fail += 1
+            signatures.pop(pdf_filename, None)
+
+    save_signatures(signatures_path, signatures)
+
+    print(
+        f"\nCompleted processing. {count_success} generated, "
+        f"{count_skipped} up to date, {count_fail} failed."
     )
 
-    tex_filename = f"{ID}_{safe_name}.tex"
-    tex_path = os.path.join(output_dir, tex_filename)
-
-    with open(tex_path, "w", encoding="utf-8") as f_out:
-        f_out.write(tex_content + "\n")
-
-    if compile_latex_to_pdf(tex_path):
-        count_success += 1
-    else:
-        count_fail += 1
-
-    row += 1
-
-
-# ============================================================
-# CLEANUP
-# ============================================================
-print("\nPerforming cleanup...")
-# Move any nested PDFs into output_dir root (defensive)
-for root, _, files in os.walk(output_dir):
-    for file in files:
-        if file.lower().endswith(".pdf"):
-            src = os.path.join(root, file)
-            dest = os.path.join(output_dir, file)
-            if src != dest:
-                try:
-                    shutil.move(src, dest)
-                except Exception:
-                    pass
-
-# Remove aux + sources + logo
-clean_directory(
-    output_dir,
-    [".aux", ".log", ".out", ".toc", ".nav", ".snm", ".bcf", ".xml", ".tex"],
-)
-
-logo_path = os.path.join(output_dir, LOGO_FILE)
-if os.path.exists(logo_path):
-    try:
-        os.remove(logo_path)
-    except Exception:
-        pass
+finally:
+    # ============================================================
+    # CLEANUP
+    # ============================================================
+    print("\nPerforming cleanup...")
+    # Drops queued jobs; running ones finish before the dir goes
+    executor.shutdown(cancel_futures=True)
+    # Aux files, sources and logo copies all live in the scratch dir
+    shutil.rmtree(scratch_dir, ignore_errors=True)
 
 elapsed = time.time() - start_time
 print(
     f"\nAll done! {count_success} PDFs generated successfully, "
-    f"{count_fail} failed."
+    f"{count_skipped} up to date, {count_fail} failed."
 )
 print(f"Clean folder ready at: {output_dir}")
 print(
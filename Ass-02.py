@@ -8,17 +8,18 @@ Created: October 2025
 Description: Automated LaTeX question booklet generator
 """
 
-import glob
 import hashlib
+import json
 import os
 import re
 import shutil
 import subprocess
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import openpyxl
-from sympy import I, Rational, cos, latex, pi, simplify, sin
 
 # ============================================================
 # CONFIGURATION
@@ -36,84 +37,224 @@ SHEET_NAME = "Worksheet"
 LOGO_FILE = "Brac_University_Logo.png"
 
 START_ROW = 2  # Data starts here (1-indexed, header on row 1)
+MAX_WORKERS = os.cpu_count() or 1  # Parallel pdflatex jobs
+# Source hash of every generated PDF, kept in output_dir for incremental runs
+SIGNATURES_FILE = ".signatures.json"
+# pdflatex scratch space; RAM-backed tmpfs where available
+SCRATCH_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else None
 
 
 # ============================================================
 # GENERIC UTILITIES
 # ============================================================
-def generate_integers_range(ID, variation, n, a, b):
+# (variation, low, high) for every question parameter, in a fixed order:
+# byte k of a student's digest feeds entry k
+QUESTION_PARAMS = (
+    ("Q1_n", 1, 4),
+    ("Q2_n", 1, 2), ("Q2_a", 2, 5), ("Q2_b", 2, 5),
+    ("Q3_n", 1, 4), ("Q3_a", 2, 4), ("Q3_b", 2, 5), ("Q3_c", 2, 5),
+    ("Q5_n", 1, 2),
+    ("Q6_a", 2, 5), ("Q6_b", 2, 5),
+    ("Q7_n", 1, 2),
+    ("Q8_n", 1, 2),
+    ("Q9_n", 1, 2),
+    ("Q10_n", 1, 3),
+)
+# Same table as (variation, low, span), so each draw is one mod and one add
+PARAM_SPANS = tuple(
+    (name, low, high - low + 1) for name, low, high in QUESTION_PARAMS
+)
+
+
+def draw_parameters(ID, specs=PARAM_SPANS):
     """
-    Deterministic pseudo-random integers based on (ID, variation).
-    Uses MD5 -> hex pairs -> base-32 -> mod range mapping.
+    Deterministic question parameters for one student, drawn in one batch.
+    A single 64-byte BLAKE2b digest of the ID; byte k is mapped into the
+    range of specs[k], a (variation, low, span) triple. Returns
+    {variation: value}.
     """
-    seed = f"{ID}{variation}"
-    h = hashlib.md5(seed.encode()).hexdigest()
-    return [
-        (int(h[i:i + 2], 32) % (b - a + 1)) + a
-        for i in range(0, n * 2, 2)
-    ]
+    if len(specs) > 64:
+        raise ValueError("At most 64 parameters fit in one BLAKE2b digest.")
+    digest = hashlib.blake2b(str(ID).encode(), digest_size=64).digest()
+    return {
+        name: byte % span + low
+        for byte, (name, low, span) in zip(digest, specs)
+    }
+
+
+PLACEHOLDER_RE = re.compile(r"@(\w+)@")
+
+
+class TemplateValues(dict):
+    """format_map mapping that leaves unknown placeholders as @key@."""
+
+    def __missing__(self, key):
+        return f"@{key}@"
+
+
+def to_format_template(text):
+    """
+    Convert a LaTeX snippet into a str.format template (done once at import).
+    Literal braces are doubled, then every @key@ placeholder becomes a
+    {key} field.
+    """
+    text = text.replace("{", "{{").replace("}", "}}")
+    return PLACEHOLDER_RE.sub(r"{\1}", text)
 
-def generate_integer(ID, variation, a, b):
+
+def build_preamble_format(template_text, work_dir, name="preamble"):
     """
-    Deterministic pseudo-random integers based on (ID, variation).
-    Uses MD5 -> hex pairs -> base-32 -> mod range mapping.
+    Dump the template preamble into a pdflatex format with mylatexformat,
+    so each compile loads the packages precompiled instead of re-reading
+    them. Returns the format path (without .fmt), or None if the dump
+    fails; callers then compile without it.
     """
-    seed = f"{ID}{variation}"
-    h = hashlib.md5(seed.encode()).hexdigest()
-    return (int(h[0:2], 32) % (b - a + 1)) + a
+    src_path = os.path.join(work_dir, f"{name}.tex")
+    with open(src_path, "w", encoding="utf-8") as f_src:
+        f_src.write(template_text)
+
+    cmd = [
+        "pdflatex", "-ini", f"-jobname={name}", "-interaction=nonstopmode",
+        "&pdflatex", "mylatexformat.ltx", f"{name}.tex",
+    ]
+    try:
+        result = subprocess.run(
+            cmd, cwd=work_dir, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, text=True
+        )
+    except OSError:
+        return None
+
+    fmt_path = os.path.join(work_dir, name)
+    if result.returncode != 0 or not os.path.exists(fmt_path + ".fmt"):
+        return None
+    return os.path.abspath(fmt_path)
 
 
-def replace_placeholders(template_text, **kwargs):
-    """Replace @Key@ placeholders in a LaTeX template."""
-    for key, val in kwargs.items():
-        template_text = template_text.replace(f"@{key}@", str(val))
-    return template_text
+# pdflatex log lines asking for another pass to settle references
+RERUN_MARKERS = ("Rerun to get", "may have changed")
 
 
-def compile_latex_to_pdf(tex_path):
+def compile_latex_to_pdf(job_dir, job_name, dest_dir, fmt=None):
     """
-    Compile .tex -> .pdf using pdflatex twice.
-    Prints a short log tail if compilation fails.
+    Compile job_dir/<job_name>.tex -> .pdf with pdflatex, running a second
+    pass only when the log asks for one, then move the PDF into dest_dir;
+    `fmt` selects a precompiled preamble format. Prints a short log tail if
+    compilation fails.
     """
-    tex_dir = os.path.dirname(tex_path) or "."
-    tex_file = os.path.basename(tex_path)
-    pdf_path = os.path.splitext(tex_path)[0] + ".pdf"
+    tex_file = job_name + ".tex"
+    pdf_file = job_name + ".pdf"
+    pdf_path = os.path.join(job_dir, pdf_file)
 
     cmd = ["pdflatex", "-interaction=nonstopmode", tex_file]
+    if fmt:
+        cmd.insert(1, f"-fmt={fmt}")
 
-    build_ok = False
-    last_stdout = ""
     for _ in range(2):
         result = subprocess.run(
-            cmd, cwd=tex_dir, stdout=subprocess.PIPE,
+            cmd, cwd=job_dir, stdout=subprocess.PIPE,
             stderr=subprocess.PIPE, text=True
         )
-        last_stdout = result.stdout
-        if result.returncode == 0:
-            build_ok = True
+        if not any(m in result.stdout for m in RERUN_MARKERS):
             break
+    last_stdout = result.stdout
 
-    # Allow filesystem to flush the PDF if it exists
-    for _ in range(10):
-        if os.path.exists(pdf_path):
-            build_ok = True
-            break
-        time.sleep(0.05)
+    # pdflatex has exited, so the PDF (if any) is already on disk; nonstop
+    # mode can emit a usable PDF despite a nonzero exit code, and a zero
+    # exit without a PDF leaves nothing to move.
+    build_ok = os.path.exists(pdf_path)
+
+    if not build_ok and fmt:
+        # The format dumped fine but something in it failed to load;
+        # give the student one more try with the full preamble
+        print(f"Retrying without the preamble format: {tex_file}")
+        return compile_latex_to_pdf(job_dir, job_name, dest_dir)
 
     if not build_ok:
         print(f"Failed: {tex_file}")
         print("Log tail:\n" + "\n".join(last_stdout.splitlines()[-15:]))
         return False
 
-    print(f"Generated: {os.path.basename(pdf_path)}\n")
+    dest_path = os.path.join(dest_dir, pdf_file)
+    try:
+        os.replace(pdf_path, dest_path)  # one rename on the same filesystem
+    except OSError:
+        try:
+            shutil.move(pdf_path, dest_path)  # e.g. tmpfs scratch -> disk
+        except (OSError, shutil.Error) as e:
+            print(f"Failed to move {pdf_file}: {e}\n")
+            return False
+    print(f"Generated: {pdf_file}\n")
     return True
 
 
+def place_logo(dst_dir):
+    """
+    Make LOGO_FILE available in dst_dir without duplicating its bytes:
+    hard link, else symlink (e.g. across filesystems), else plain copy.
+    """
+    dst = os.path.join(dst_dir, os.path.basename(LOGO_FILE))
+    if os.path.lexists(dst):
+        return  # already placed (e.g. a repeated roster row)
+    try:
+        os.link(LOGO_FILE, dst)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.abspath(LOGO_FILE), dst)
+    except OSError:
+        shutil.copy(LOGO_FILE, dst_dir)
+
+
+def load_signatures(path):
+    """Return the {pdf name: source signature} manifest ({} if missing)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f_sig:
+            return json.load(f_sig)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_signatures(path, signatures):
+    """Write the {pdf name: source signature} manifest."""
+    with open(path, "w", encoding="utf-8") as f_sig:
+        json.dump(signatures, f_sig, indent=1, sort_keys=True)
+
+
+# ASCII characters safe_filename drops (everything but \w, \s and "-")
+SAFE_FILENAME_DELETE = str.maketrans("", "", "".join(
+    ch for ch in map(chr, range(128))
+    if not (ch.isalnum() or ch.isspace() or ch in "_-")
+))
+
+
 def safe_filename(name):
-    """Return a filesystem-safe basename for a given string."""
-    return re.sub(r"[^\w\s-]", "", str(name or "Unknown")).strip().replace(
-        " ", "_"
-    )
+    """
+    Return a filesystem-safe basename for a given string.
+    ASCII names go through one translate; others keep the Unicode-aware
+    regex so non-Latin letters survive.
+    """
+    name = str(name or "Unknown")
+    if name.isascii():
+        name = name.translate(SAFE_FILENAME_DELETE)
+    else:
+        name = re.sub(r"[^\w\s-]", "", name)
+    return name.strip().replace(" ", "_")
+
+
+LATEX_ESCAPES = str.maketrans({
+    "\\": r"\textbackslash{}",
+    "&": r"\&",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+})
 
 
 def latex_escape_text(s):
@@ -123,39 +264,7 @@ def latex_escape_text(s):
     """
     if s is None:
         return "Unknown"
-    repl = {
-        "\\": r"\textbackslash{}",
-        "&": r"\&",
-        "%": r"\%",
-        "$": r"\$",
-        "#": r"\#",
-        "_": r"\_",
-        "{": r"\{",
-        "}": r"\}",
-        "~": r"\textasciitilde{}",
-        "^": r"\textasciicircum{}",
-    }
-    return "".join(repl.get(ch, ch) for ch in str(s))
-
-
-def clean_directory(directory, extensions):
-    """Remove files by extension; prune empty subfolders."""
-    for ext in extensions:
-        for f in glob.glob(os.path.join(directory, f"**/*{ext}"),
-                           recursive=True):
-            try:
-                os.remove(f)
-            except Exception as e:
-                print(f"Skipped {f}: {e}")
-
-    for root, dirs, _ in os.walk(directory, topdown=False):
-        for d in dirs:
-            p = os.path.join(root, d)
-            try:
-                if not os.listdir(p):
-                    shutil.rmtree(p, ignore_errors=True)
-            except Exception:
-                pass
+    return str(s).translate(LATEX_ESCAPES)
 
 
 # ============================================================
@@ -168,92 +277,102 @@ def clean_directory(directory, extensions):
 # QUESTION BANK
 # (Return LaTeX snippets ready to drop into @Qk@ placeholders)
 # ============================================================
+Q1_FORMS = (
+    r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\sin(at)\}=\frac{a}{s^{2}+a^2}. \]",
+    r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\cos(at)\}=\frac{s}{s^{2}+a^2}. \]",
+    r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\sinh(at)\}=\frac{a}{s^{2}-a^2}. \]",
+    r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\cosh(at)\}=\frac{s}{s^{2}-a^2}. \]",
+)
+
+
 def Q1_Formula_Proof(n: int) -> str:
-    arr = [
-        r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\sin(at)\}=\frac{a}{s^{2}+a^2}. \]",
-        r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\cos(at)\}=\frac{s}{s^{2}+a^2}. \]",
-        r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\sinh(at)\}=\frac{a}{s^{2}-a^2}. \]",
-        r"We know that the Laplace transform of a function $f(t)$ is defined by \[ \mathcal{L}\{f(t)\}=\int_{0}^{\infty} e^{-st} f(t)\,dt\] Using this definition, show that \[ \mathcal{L}\{\cosh(at)\}=\frac{s}{s^{2}-a^2}. \]",
-    ]
-    s = arr[n - 1]
-    return s
+    return Q1_FORMS[n - 1]
+
+
+Q2_FORMS = tuple(to_format_template(s) for s in (
+    r"Using definition, find the Laplace transform of the piecewise function \[ f(t)= \begin{cases} @a@ \sin @b@t, & 0\le t<\pi,\\[4pt] 0, & t\ge \pi. \end{cases} \]",
+    r"Using definition, find the Laplace transform of the piecewise function \[ f(t)= \begin{cases} 0, & 0\le t<\pi,\\[4pt] @a@ \cos @b@t, & t\ge \pi. \end{cases} \]",
+))
 
 
 def Q2_Piecewise(n: int, a: int, b: int) -> str:
-    arr = [
-        r"Using definition, find the Laplace transform of the piecewise function \[ f(t)= \begin{cases} @a@ \sin @b@t, & 0\le t<\pi,\\[4pt] 0, & t\ge \pi. \end{cases} \]",
-        r"Using definition, find the Laplace transform of the piecewise function \[ f(t)= \begin{cases} 0, & 0\le t<\pi,\\[4pt] @a@ \cos @b@t, & t\ge \pi. \end{cases} \]",
-    ]
-    s = arr[n - 1]
-    s = s.replace("@a@", str(a)).replace("@b@", str(b))
-    return s
+    return Q2_FORMS[n - 1].format(a=a, b=b)
+
+
+Q3_FORMS = tuple(to_format_template(s) for s in (
+    r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{-@a@t} \sin(@b@t) \sin(@c@t) \]",
+    r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{@a@t} \cos(@b@t) \cos(@c@t) \]",
+    r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{-@a@t} \sin(@b@t) \cos(@c@t) \]",
+    r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{@a@t} \cos(@b@t) \sin(@c@t) \]",
+))
 
 
 def Q3_First_Translation(n: int, a: int, b: int, c: int) -> str:
-    arr = [
-        r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{-@a@t} \sin(@b@t) \sin(@c@t) \]",
-        r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{@a@t} \cos(@b@t) \cos(@c@t) \]",
-        r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{-@a@t} \sin(@b@t) \cos(@c@t) \]",
-        r"Find the Laplace transform of the piecewise function \[ f(t)= t e^{@a@t} \cos(@b@t) \sin(@c@t) \]",
-    ]
-    s = arr[n - 1]
-    s = s = s.replace("@a@", str(a)).replace("@b@", str(b)).replace("@c@", str(c))
-    return s
+    return Q3_FORMS[n - 1].format(a=a, b=b, c=c)
 
 
 def Q4_Inverse_Translation() -> str:
     return r"Solve the Inverse Laplace problem\[\mathcal{L}^{-1}\left\{\frac{s}{s^{2}+2s-3}\right\}\]"
 
 
+Q5_FORMS = (
+    r"Solve the Inverse Laplace problem\[\mathcal{L}^{-1}\left\{\frac{2s-4}{(s^2+s)(s^2+1)}\right\}\]",
+    r"Solve the Inverse Laplace problem\[\mathcal{L}^{-1}\left\{\frac{6s+3}{s^{4}+5s^{2}+4}\right\}\]",
+)
+
+
 def Q5_Inverse_Partial(n: int) -> str:
-    arr = [
-        r"Solve the Inverse Laplace problem\[\mathcal{L}^{-1}\left\{\frac{2s-4}{(s^2+s)(s^2+1)}\right\}\]",
-        r"Solve the Inverse Laplace problem\[\mathcal{L}^{-1}\left\{\frac{6s+3}{s^{4}+5s^{2}+4}\right\}\]",
-    ]
-    s = arr[n - 1]
-    return s
+    return Q5_FORMS[n - 1]
 
 
-def Q6_ODE_First_Order(a: int, b: int) -> str:    
-    s = r"Use the Laplace transform to solve the given differential equation \[ y' + y = e^{-@a@t}\cos(@b@t),\qquad y(0)=0. \]"
-    s = s.replace("@a@", str(a)).replace("@b@", str(b))
-    return s
+Q6_FORM = to_format_template(
+    r"Use the Laplace transform to solve the given differential equation \[ y' + y = e^{-@a@t}\cos(@b@t),\qquad y(0)=0. \]"
+)
+
+
+def Q6_ODE_First_Order(a: int, b: int) -> str:
+    return Q6_FORM.format(a=a, b=b)
+
+
+Q7_FORMS = (
+    r"Use the Laplace transform to solve the given differential equation \[ 2y''' + 3y'' - 3y' - 2y = e^{-t},\qquad y(0)=0,\; y'(0)=0,\; y''(0)=1. \]",
+    r"Use the Laplace transform to solve the given differential equation \[ y''' + 2y'' - y' - 2y = \sin(3t),\qquad y(0)=0,\; y'(0)=0,\; y''(0)=1. \]",
+)
 
 
 def Q7_ODE_Third_Order(n: int) -> str:
-    arr = [
-        r"Use the Laplace transform to solve the given differential equation \[ 2y''' + 3y'' - 3y' - 2y = e^{-t},\qquad y(0)=0,\; y'(0)=0,\; y''(0)=1. \]",
-        r"Use the Laplace transform to solve the given differential equation \[ y''' + 2y'' - y' - 2y = \sin(3t),\qquad y(0)=0,\; y'(0)=0,\; y''(0)=1. \]",
-    ]
-    return arr[n - 1]
+    return Q7_FORMS[n - 1]
+
+
+Q8_FORMS = (
+    r"Use the Laplace transform to solve the given differential equation \[ y'' + 9y = \cos 3t,\qquad y(0)=2,\; y'(0)=5. \]",
+    r"Use the Laplace transform to solve the given differential equation \[y'' + y = \sin t,\qquad y(0)=1,\; y'(0)=-1.\]",
+)
 
 
 def Q8_ODE_Second_Order(n: int) -> str:
-    arr = [
-        r"Use the Laplace transform to solve the given differential equation \[ y'' + 9y = \cos 3t,\qquad y(0)=2,\; y'(0)=5. \]",
-        r"Use the Laplace transform to solve the given differential equation \[y'' + y = \sin t,\qquad y(0)=1,\; y'(0)=-1.\]",
-    ]
-    s = arr[n - 1]
-    return s
+    return Q8_FORMS[n - 1]
+
+
+Q9_FORMS = (
+    r"Use the Laplace transform to solve the given differential equation \[ y' + y = t\sin t,\qquad y(0)=0. \]",
+    r"Use the Laplace transform to solve the given differential equation \[ y' - y = t e^{t}\sin t,\qquad y(0)=0. \]",
+)
 
 
 def Q9_ODE_Second_t_trig(n: int) -> str:
-    arr = [
-        r"Use the Laplace transform to solve the given differential equation \[ y' + y = t\sin t,\qquad y(0)=0. \]",
-        r"Use the Laplace transform to solve the given differential equation \[ y' - y = t e^{t}\sin t,\qquad y(0)=0. \]",
-    ]
-    s = arr[n - 1]
-    return s
+    return Q9_FORMS[n - 1]
+
+
+Q10_FORMS = (
+    r"Use the Laplace transform to solve the given system of differential equations \[\begin{aligned}\frac{dx}{dt} &= x - 2y,\\\frac{dy}{dt} &= 5x - y,\end{aligned}\qquad x(0) = -1,\; y(0) = 2.\]",
+    r"Use the Laplace transform to solve the given system of differential equations \[ \begin{aligned} \frac{dx}{dt} &= 2y + e^{t},\\ \frac{dy}{dt} &= 8x - t, \end{aligned} \qquad x(0) = 1,\; y(0) = 1. \]",
+    r"Use the Laplace transform to solve the given system of differential equations \[ \begin{aligned} 2\frac{dx}{dt} + \frac{dy}{dt} - 2x &= 1,\\ \frac{dx}{dt} + \frac{dy}{dt} - 3x - 3y &= 2, \end{aligned} \qquad x(0)=0,\; y(0)=0. \]",
+)
 
 
 def Q10_ODE_System(n: int) -> str:
-    arr = [
-        r"Use the Laplace transform to solve the given system of differential equations \[\begin{aligned}\frac{dx}{dt} &= x - 2y,\\\frac{dy}{dt} &= 5x - y,\end{aligned}\qquad x(0) = -1,\; y(0) = 2.\]",
-        r"Use the Laplace transform to solve the given system of differential equations \[ \begin{aligned} \frac{dx}{dt} &= 2y + e^{t},\\ \frac{dy}{dt} &= 8x - t, \end{aligned} \qquad x(0) = 1,\; y(0) = 1. \]",
-        r"Use the Laplace transform to solve the given system of differential equations \[ \begin{aligned} 2\frac{dx}{dt} + \frac{dy}{dt} - 2x &= 1,\\ \frac{dx}{dt} + \frac{dy}{dt} - 3x - 3y &= 2, \end{aligned} \qquad x(0)=0,\; y(0)=0. \]",
-    ]
-    s = arr[n - 1]
-    return s
+    return Q10_FORMS[n - 1]
 
 
 
@@ -271,16 +390,22 @@ output_dir = ASSESSMENT_TYPE
 os.makedirs(output_dir, exist_ok=True)
 print(f"Output directory: {output_dir}")
 
-# Copy logo (some templates include it from working dir)
+# PDFs whose rendered source is unchanged since the last run are skipped
+signatures_path = os.path.join(output_dir, SIGNATURES_FILE)
+signatures = load_signatures(signatures_path)
+
+# Logo is linked into each job folder (templates include it from cwd)
 if os.path.exists(LOGO_FILE):
-    shutil.copy(LOGO_FILE, output_dir)
-    print(f"Copied logo → {output_dir}/")
+    print(f"Using logo: {LOGO_FILE}")
 else:
     print(f"Logo not found: '{LOGO_FILE}' (skipped)")
 
 # Load workbook/template
 try:
-    workbook = openpyxl.load_workbook(WORKBOOK_PATH)
+    # Read-only mode streams rows instead of building the full cell graph
+    workbook = openpyxl.load_workbook(
+        WORKBOOK_PATH, read_only=True, data_only=True
+    )
     sheet = workbook[SHEET_NAME]
 except Exception as e:
     raise SystemExit(f"Error loading workbook/sheet: {e}")
@@ -291,137 +416,178 @@ try:
 except FileNotFoundError:
     raise SystemExit(f"Template not found: {TEMPLATE_PATH}")
 
+# Placeholder positions are fixed; only their values change per student
+template_fmt = to_format_template(template)
+
 print("\nStarting PDF generation...\n")
 
 
 # ============================================================
 # MAIN LOOP
 # ============================================================
-count_success, count_fail = 0, 0
-row = START_ROW
+count_success, count_fail, count_skipped = 0, 0, 0
+rows = sheet.iter_rows(min_row=START_ROW, max_col=2, values_only=True)
+
+# Each student compiles in its own folder under a scratch dir; only the
+# finished PDF is moved to output_dir, so aux files never touch it.
+scratch_dir = tempfile.mkdtemp(prefix="latex-jobs-", dir=SCRATCH_ROOT)
+print(f"Scratch directory: {scratch_dir}")
+
+# pdflatex runs as a child process, so threads are enough to keep every
+# core busy without pickling the module-level script state. Each job is
+# submitted as soon as its .tex is written, so compiling overlaps with
+# generating the remaining students.
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+futures = {}
+
+# The scratch dir lives in RAM, so it must go however the run ends
+try:
+    # The shared preamble is precompiled just before the first compile, so
+    # a run where every PDF is up to date skips the format dump entirely
+    preamble_fmt, preamble_built = None, False
 
-while True:
-    ID = sheet.cell(row=row, column=1).value
-    Name = sheet.cell(row=row, column=2).value
+    for index, (ID, Name) in enumerate(rows, start=1):
+        if not ID:
+            break
 
-    if not ID:
-        print(
-            f"\nCompleted processing. {count_success} succeeded, "
-            f"{count_fail} failed."
-        )
-        break
+        safe_name = safe_filename(Name)
+        latex_name = latex_escape_text(Name)
 
-    safe_name = safe_filename(Name)
-    latex_name = latex_escape_text(Name)
+        print(f"[{index}] Processing: {Name}")
+        job_name = f"{ID}_{safe_name}"  # shared stem of the .tex and .pdf
 
-    print(f"[{row - START_ROW + 1}] Processing: {Name}")
+        params = draw_parameters(ID)
 
-    Q1 = Q1_Formula_Proof(
-        generate_integer(ID, "Q1_n", 1, 4),
-    )
+        Q1 = Q1_Formula_Proof(
+            params["Q1_n"],
+        )
 
-    Q2 = Q2_Piecewise(
-        generate_integer(ID, "Q2_n", 1, 2),
-        generate_integer(ID, "Q2_a", 2, 5),
-        generate_integer(ID, "Q2_b", 2, 5),
-    )
+        Q2 = Q2_Piecewise(
+            params["Q2_n"],
+            params["Q2_a"],
+            params["Q2_b"],
+        )
 
-    Q3 = Q3_First_Translation(
-        generate_integer(ID, "Q3_n", 1, 4),
-        generate_integer(ID, "Q3_a", 2, 4),
-        generate_integer(ID, "Q3_b", 2, 5),
-        generate_integer(ID, "Q3_a", 2, 5),
-    )
+        Q3 = Q3_First_Translation(
+            params["Q3_n"],
+            params["Q3_a"],
+            params["Q3_b"],
+            params["Q3_c"],
+        )
 
-    Q4 = Q4_Inverse_Translation()
+        Q4 = Q4_Inverse_Translation()
 
-    Q5 = Q5_Inverse_Partial(
-        generate_integer(ID, "Q5_n", 1, 2)
-    )
+        Q5 = Q5_Inverse_Partial(
+            params["Q5_n"]
+        )
 
-    Q6 = Q6_ODE_First_Order(
-        generate_integer(ID, "Q6_a", 2, 5),
-        generate_integer(ID, "Q6_b", 2, 5),
-    )
+        Q6 = Q6_ODE_First_Order(
+            params["Q6_a"],
+            params["Q6_b"],
+        )
 
-    Q7 = Q7_ODE_Third_Order(
-        generate_integer(ID, "Q7_n", 1, 2)
-    )
+        Q7 = Q7_ODE_Third_Order(
+            params["Q7_n"]
+        )
 
-    Q8 = Q8_ODE_Second_Order(
-        generate_integer(ID, "Q8_n", 1, 2),
-    )
+        Q8 = Q8_ODE_Second_Order(
+            params["Q8_n"],
+        )
 
-    Q9 = Q9_ODE_Second_t_trig(
-        generate_integer(ID, "Q9_n", 1, 2),
-    )
+        Q9 = Q9_ODE_Second_t_trig(
+            params["Q9_n"],
+        )
 
-    Q10 = Q10_ODE_System(
-        generate_integer(ID, "Q10_n", 1, 3),
-    )
+        Q10 = Q10_ODE_System(
+            params["Q10_n"],
+        )
 
-    tex_content = replace_placeholders(
-        template,
-        Name=latex_name,
-        ID=ID,
-        Section=SECTION,
-        CourseName=COURSE_NAME,
-        CourseCode=COURSE_CODE,
-        SemesterName=SEMESTER_NAME,
-        AssessmentType=ASSESSMENT_TYPE,
-        TotalPoints=TOTAL_POINTS,
-
-        Q1=Q1, Q2=Q2, Q3=Q3, Q4=Q4, Q5=Q5,
-        Q6=Q6, Q7=Q7, Q8=Q8, Q9=Q9, Q10=Q10,
+        tex_content = template_fmt.format_map(TemplateValues(
+            Name=latex_name,
+            ID=ID,
+            Section=SECTION,
+            CourseName=COURSE_NAME,
+            CourseCode=COURSE_CODE,
+            SemesterName=SEMESTER_NAME,
+            AssessmentType=ASSESSMENT_TYPE,
+            TotalPoints=TOTAL_POINTS,
+
+            Q1=Q1, Q2=Q2, Q3=Q3, Q4=Q4, Q5=Q5,
+            Q6=Q6, Q7=Q7, Q8=Q8, Q9=Q9, Q10=Q10,
+        )).encode("utf-8")
+
+        # The rendered source covers the row, config, template and question bank
+        signature = hashlib.blake2b(tex_content, digest_size=16).hexdigest()
+        pdf_filename = job_name + ".pdf"
+        if (signatures.get(pdf_filename) == signature
+                and os.path.exists(os.path.join(output_dir, pdf_filename))):
+            print(f"Up to date: {pdf_filename}")
+            count_skipped += 1
+            continue
+
+        # Each student gets its own scratch folder so parallel pdflatex runs
+        # never share .aux/.log files
+        job_dir = tempfile.mkdtemp(prefix=job_name + "-", dir=scratch_dir)
+        if os.path.exists(LOGO_FILE):
+            place_logo(job_dir)
+
+        tex_path = os.path.join(job_dir, job_name + ".tex")
+
+        with open(tex_path, "wb") as f_out:
+            f_out.writelines((tex_content, b"\n"))
+
+        if not preamble_built:
+            preamble_fmt = build_preamble_format(template, scratch_dir)
+            preamble_built = True
+            if preamble_fmt:
+                print(f"Preamble format: {preamble_fmt}.fmt")
+            else:
+                print("Preamble format unavailable (mylatexformat?); "
+                      "compiling in full")
+
+        future = executor.submit(
+            compile_latex_to_pdf, job_dir, job_name, output_dir, preamble_fmt
+        )
+        futures[future] = (job_name, signature)
+
+    workbook.close()
+
+    # ============================================================
+    # COMPILE (parallel pdflatex)
+    # ============================================================
+    print(f"\nWaiting for {len(futures)} documents ({MAX_WORKERS} workers)...\n")
+
+    for future in as_completed(futures):
+        job_name, signature = futures[future]
+        pdf_filename = job_name + ".pdf"
+        if future.result():
+            count_success += 1
+            signatures[pdf_filename] = signature
+        else:
+            count_fail += 1
+            signatures.pop(pdf_filename, None)
+
+    save_signatures(signatures_path, signatures)
+
+    print(
+        f"\nCompleted processing. {count_success} generated, "
+        f"{count_skipped} up to date, {count_fail} failed."
     )
 
-    tex_filename = f"{ID}_{safe_name}.tex"
-    tex_path = os.path.join(output_dir, tex_filename)
-
-    with open(tex_path, "w", encoding="utf-8") as f_out:
-        f_out.write(tex_content + "\n")
-
-    if compile_latex_to_pdf(tex_path):
-        count_success += 1
-    else:
-        count_fail += 1
-
-    row += 1
-
-
-# ============================================================
-# CLEANUP
-# ============================================================
-print("\nPerforming cleanup...")
-# Move any nested PDFs into output_dir root (defensive)
-for root, _, files in os.walk(output_dir):
-    for file in files:
-        if file.lower().endswith(".pdf"):
-            src = os.path.join(root, file)
-            dest = os.path.join(output_dir, file)
-            if src != dest:
-                try:
-                    shutil.move(src, dest)
-                except Exception:
-                    pass
-
-# Remove aux + sources + logo
-clean_directory(
-    output_dir,
-    [".aux", ".log", ".out", ".toc", ".nav", ".snm", ".bcf", ".xml", ".tex"],
-)
-
-logo_path = os.path.join(output_dir, LOGO_FILE)
-if os.path.exists(logo_path):
-    try:
-        os.remove(logo_path)
-    except Exception:
-        pass
+finally:
+    # ============================================================
+    # CLEANUP
+    # ============================================================
+    print("\nPerforming cleanup...")
+    # Drops queued jobs; running ones finish before the dir goes
+    executor.shutdown(cancel_futures=True)
+    # Aux files, sources, logo copies and the preamble format live in scratch
+    shutil.rmtree(scratch_dir, ignore_errors=True)
 
 elapsed = time.time() - start_time
 print(
     f"\nAll done! {count_success} PDFs generated successfully, "
-    f"{count_fail} failed."
+    f"{count_skipped} up to date, {count_fail} failed."
 )
 print(f"Clean folder ready at: {output_dir}")
 print(